@@ -0,0 +1,481 @@
+import streamlit as st
+import bcrypt
+import csv
+import io
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# Authentication
+# bcrypt hash of the login password, read from auth.hash in Streamlit secrets (cost 12, ~100ms+ per check).
+# There is no built-in fallback: without the secret the pages refuse every login
+_MAX_PASSWORD_BYTES = 72
+
+def _password_hash():
+    """Return the configured bcrypt hash, or None if auth.hash is not in Streamlit secrets"""
+    try:
+        return st.secrets["auth"]["hash"].encode()
+    except (KeyError, FileNotFoundError):  # Missing key, or no secrets.toml at all
+        return None
+
+def check_password():
+    """Returns `True` if the user had the correct password."""
+    def password_entered():
+        """Checks whether a password entered by the user is correct."""
+        # Already verified in this session - never pay for bcrypt twice
+        if st.session_state.get("password_correct", False):
+            return
+        
+        # Deliberately slow, salted hash; it only runs when the password field changes.
+        # bcrypt only uses the first 72 bytes, so anything longer is rejected without hashing
+        pw_bytes = st.session_state["password"].encode()
+        password_hash = _password_hash()
+        try:
+            correct = (password_hash is not None and len(pw_bytes) <= _MAX_PASSWORD_BYTES
+                       and bcrypt.checkpw(pw_bytes, password_hash))
+        except ValueError:  # Malformed auth.hash - treat as a failed login rather than crash the callback
+            correct = False
+        st.session_state["password_correct"] = correct
+        del st.session_state["password"]  # Don't store the password, right or wrong
+
+    # Return True if password is validated
+    if st.session_state.get("password_correct", False):
+        return True
+
+    if _password_hash() is None:
+        st.error("🔒 Login is not configured: add the bcrypt hash as auth.hash in Streamlit secrets")
+        return False
+
+    # Show input for password
+    st.text_input("Password", type="password", on_change=password_entered, key="password")
+    if "password_correct" in st.session_state and not st.session_state["password_correct"]:
+        st.error("😕 Password incorrect")
+    return False
+
+# Potential injection attempts, matched in one case-insensitive scan
+_BLOCKED_RE = re.compile(r'<script|javascript:|eval\(|exec\(', re.IGNORECASE)
+
+def validate_input(query, max_bytes=2000):
+    """Validate user input for security"""
+    # Only validate user input length (not system prompt), in UTF-8 bytes rather than characters:
+    # Bedrock bills by tokens, and multi-byte scripts pack more of them into each character
+    if len(query.encode('utf-8')) > max_bytes:  # Reasonable limit for user queries
+        return False, f"Query too long (max {max_bytes} bytes)"
+    
+    # Block potential injection attempts
+    if _BLOCKED_RE.search(query):
+        return False, "Invalid input detected"
+    
+    return True, ""
+
+# Initialize AWS clients
+# One session and one client per service for the whole process, shared by every session and worker thread
+AWS_REGION = 'us-east-1'
+# botocore Config arguments; boto3 itself is imported on first use so the login screen renders without it
+_CLIENT_CONFIG = dict(
+    max_pool_connections=50,  # Room for concurrent sessions and the 'both' fan-out
+    tcp_keepalive=True,
+    retries={'mode': 'adaptive', 'max_attempts': 5}  # Adaptive mode backs off on throttling
+)
+_session = None
+_clients = {}
+_clients_lock = threading.RLock()
+
+def _aws_credentials():
+    """Use Streamlit secrets if configured, otherwise fall back to the default AWS credential chain"""
+    try:
+        return {
+            'aws_access_key_id': st.secrets["aws"]["AWS_ACCESS_KEY_ID"],
+            'aws_secret_access_key': st.secrets["aws"]["AWS_SECRET_ACCESS_KEY"]
+        }
+    except Exception:
+        return {}
+
+def get_session():
+    """Return the shared boto3 session, resolving credentials on first use"""
+    global _session
+    if _session is None:
+        with _clients_lock:
+            if _session is None:
+                import boto3
+                _session = boto3.Session(region_name=AWS_REGION, **_aws_credentials())
+    return _session
+
+def get_client(service_name):
+    """Return the shared boto3 client for service_name, creating it on first use"""
+    client = _clients.get(service_name)
+    if client is None:
+        # boto3 sessions are not thread-safe, so client creation stays under the lock
+        with _clients_lock:
+            client = _clients.get(service_name)
+            if client is None:
+                from botocore.config import Config
+                client = get_session().client(service_name, config=Config(**_CLIENT_CONFIG))
+                _clients[service_name] = client
+    return client
+
+# Worker pool shared by every session for fanning out independent AWS calls;
+# sized to the connection pool so concurrent sessions don't queue behind each other
+_EXECUTOR = ThreadPoolExecutor(max_workers=_CLIENT_CONFIG['max_pool_connections'])
+
+# Configuration
+KB_ID = "HBNUJXVNB8"  # Bedrock Knowledge Base
+QBUSINESS_APP_ID = "71fee8c3-d898-4d1b-b70a-c624128d7028"  # Q Business App
+MODEL_ARN = "arn:aws:bedrock:us-east-1::foundation-model/anthropic.claude-3-5-sonnet-20240620-v1:0"
+KB_MODEL_ARN = "arn:aws:bedrock:us-east-1::foundation-model/anthropic.claude-3-sonnet-20240229-v1:0"  # Knowledge-base-only pages
+RETRIEVAL_CONFIGURATION = {'vectorSearchConfiguration': {'numberOfResults': 10}}
+
+# In-process Bedrock response cache, {key: (timestamp, response)}; only successful calls are stored.
+# Q Business chat_sync is a stateful conversation API, so its responses are never cached
+CACHE_TTL = 600  # seconds
+CACHE_MAX_ENTRIES = 256
+_KB_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+def _cache_lookup(cache, key):
+    """Return the cached response if it is younger than CACHE_TTL, else None"""
+    with _CACHE_LOCK:
+        entry = cache.get(key)
+    if entry is not None and time.monotonic() - entry[0] < CACHE_TTL:
+        return entry[1]
+    return None
+
+def _cache_store(cache, key, response):
+    with _CACHE_LOCK:
+        cache[key] = (time.monotonic(), response)
+        while len(cache) > CACHE_MAX_ENTRIES:
+            cache.pop(next(iter(cache)))  # Evict the oldest entry
+
+def _get_cached(cache, key, fn, *args):
+    """Return a cached response younger than CACHE_TTL, otherwise call fn and store the result"""
+    response = _cache_lookup(cache, key)
+    if response is None:
+        response = fn(*args)
+        _cache_store(cache, key, response)
+    return response
+
+def _chat_qbusiness(query, conversation_id):
+    return get_client('qbusiness').chat_sync(
+        applicationId=QBUSINESS_APP_ID,
+        userMessage=query,
+        conversationId=conversation_id
+    )
+
+def _kb_configuration(kb_id, model_arn, retrieval_configuration):
+    config = {'knowledgeBaseId': kb_id, 'modelArn': model_arn}
+    if retrieval_configuration:
+        config['retrievalConfiguration'] = retrieval_configuration
+    return {'type': 'KNOWLEDGE_BASE', 'knowledgeBaseConfiguration': config}
+
+def retrieve_and_generate(text, kb_id=KB_ID, model_arn=MODEL_ARN, retrieval_configuration=RETRIEVAL_CONFIGURATION):
+    """Run Bedrock retrieve_and_generate against a knowledge base and return the raw response"""
+    return get_client('bedrock-agent-runtime').retrieve_and_generate(
+        input={'text': text},
+        retrieveAndGenerateConfiguration=_kb_configuration(kb_id, model_arn, retrieval_configuration)
+    )
+
+def _kb_cache_key(text, kb_id, model_arn, retrieval_configuration):
+    return (text, kb_id, model_arn, repr(retrieval_configuration))
+
+def cached_retrieve_and_generate(text, kb_id=KB_ID, model_arn=MODEL_ARN, retrieval_configuration=RETRIEVAL_CONFIGURATION):
+    """retrieve_and_generate through the in-process TTL cache, so repeated queries skip the round-trip"""
+    key = _kb_cache_key(text, kb_id, model_arn, retrieval_configuration)
+    return _get_cached(_KB_CACHE, key, retrieve_and_generate, text, kb_id, model_arn, retrieval_configuration)
+
+def query_qbusiness(query, conversation_id=None):
+    """Query Q Business application"""
+    # No st.session_state access here - this runs on worker threads for the 'both' route
+    try:
+        response = _chat_qbusiness(query, conversation_id)
+        
+        return {
+            'source': 'Q Business',
+            'answer': response.get('systemMessage', 'No response'),
+            'sources': response.get('sourceAttributions', []),
+            'conversation_id': response.get('conversationId', conversation_id)
+        }
+    except Exception as e:
+        return {
+            'source': 'Q Business',
+            'answer': f"Error: {str(e)}",
+            'sources': [],
+            'conversation_id': conversation_id
+        }
+
+def remember_qbusiness_conversation(result):
+    """Store the Q Business conversation ID for context on the next query"""
+    if result.get('conversation_id'):
+        st.session_state.qbusiness_conversation_id = result['conversation_id']
+
+def query_bedrock_kb(query):
+    """Query Bedrock Knowledge Base"""
+    try:
+        response = cached_retrieve_and_generate(query)
+        
+        return {
+            'source': 'Bedrock Knowledge Base',
+            'answer': response['output']['text'],
+            'sources': response.get('citations', [])
+        }
+    except Exception as e:
+        return {
+            'source': 'Bedrock Knowledge Base',
+            'answer': f"Error: {str(e)}",
+            'sources': []
+        }
+
+def stream_retrieve_and_generate(text, sources=None, kb_id=KB_ID, model_arn=MODEL_ARN, retrieval_configuration=RETRIEVAL_CONFIGURATION):
+    """Yield a knowledge base answer as it is generated, through the TTL cache; AWS errors propagate"""
+    key = _kb_cache_key(text, kb_id, model_arn, retrieval_configuration)
+    response = _cache_lookup(_KB_CACHE, key)
+    if response is not None:
+        if sources is not None:
+            sources.extend(response.get('citations', []))
+        yield response['output']['text']
+        return
+    
+    chunks = []
+    citations = []
+    response = get_client('bedrock-agent-runtime').retrieve_and_generate_stream(
+        input={'text': text},
+        retrieveAndGenerateConfiguration=_kb_configuration(kb_id, model_arn, retrieval_configuration)
+    )
+    for event in response['stream']:
+        if 'output' in event:
+            chunks.append(event['output']['text'])
+            yield event['output']['text']
+        elif 'citation' in event:
+            citations.append({
+                'generatedResponsePart': event['citation'].get('generatedResponsePart'),
+                'retrievedReferences': event['citation'].get('retrievedReferences', [])
+            })
+    
+    # Cache in the same shape as retrieve_and_generate so the blocking callers can reuse it
+    _cache_store(_KB_CACHE, key, {'output': {'text': "".join(chunks)}, 'citations': citations})
+    if sources is not None:
+        sources.extend(citations)
+
+def stream_bedrock_kb(query, sources):
+    """Yield the Bedrock Knowledge Base answer as it is generated, appending citations to sources"""
+    try:
+        yield from stream_retrieve_and_generate(query, sources)
+    except Exception as e:
+        yield f"Error: {str(e)}"
+
+def query_both(query, conversation_id=None):
+    """Query Q Business and Bedrock KB concurrently, returning (qb_result, kb_result)"""
+    # boto3 releases the GIL while waiting on the network, so the two calls overlap.
+    # Only Q Business goes to the pool; Bedrock runs on the session's own script thread
+    f_qb = _EXECUTOR.submit(query_qbusiness, query, conversation_id)
+    kb_result = query_bedrock_kb(query)
+    return f_qb.result(), kb_result
+
+# System prompt for the assistant
+SYSTEM_PROMPT = """You are the Migration Health AI Assistant for AWS HCLS migration and modernization engagements. 
+
+Your scope includes:
+- HCLS customer territory code wise analysis
+- SFDC customer name wise migration status analysis and reporting
+- Migration status insights including deal type, migration health, revenue realization, partner engagements
+- Excel data analysis from YTD_Revenue_Progress and Detailed_Report sheets
+
+Data Sources:
+- Detailed_Report: Customer Territory Code, Migration Delivered By, Deal Type, SFDC Customer Name, Engagement ID, Migration Health, Revenue data
+- YTD_Revenue_Progress: Partner Engagement, SFDC Customer Name, Engagement ID, Migration Status, Migration ARR
+- Pipeline_Detail and ARR_Win_Deal: ONLY for migration pipeline queries
+
+For queries starting with "Show" or "List", provide responses in clear tabular format.
+Do not provide hypothetical examples - use only actual data from the knowledge base.
+Focus on migration performance analysis, challenge identification, and improvement suggestions."""
+
+# Constant part of the query sent to the knowledge base; the user query is appended to it
+QUERY_PREFIX = SYSTEM_PROMPT + "\n\nUser Query: "
+
+# Sample queries, built once per process rather than on every rerun
+# Q&A page sidebar buttons: (query, widget key)
+SAMPLE_QUERIES = tuple((query, f"sample_{i}") for i, query in enumerate((
+    "Show migration status for ModivCare",
+    "What is the current YTD revenue realization vs target?",
+    "List all partner-attached migrations and their performance",
+    "Which migrations have high spend variance?",
+    "Calculate revenue attainment for Q3",
+    "Identify at-risk migrations",
+    "Partner performance analysis"
+)))
+
+# Knowledge-base page sidebar examples: (heading, queries)
+SAMPLE_QUERY_GROUPS = (
+    ("Account-Specific", ('Show migration status for [SFDC Customer Name]', 'What are the key challenges for [Customer]?')),
+    ("Revenue Performance", ('Which accounts are behind benchmark in revenue?', 'Show revenue trend for [account name]')),
+    ("Partner Analysis", ('Which partners are leading in migration revenue?', 'Show partner-related execution challenges')),
+    ("Territory Analysis", ('Which territories need pipeline growth?', 'Compare territory performance metrics')),
+    ("Risk Assessment", ('Show mitigation plans for at-risk accounts', 'Provide risk analysis for [account]'))
+)
+
+# Knowledge-base page Quick Action buttons: (label, query), laid out two per column
+QUICK_ACTIONS = (
+    ("📊 YTD Revenue vs Target", "What is the current YTD revenue realization vs target?"),
+    ("🏢 Territory Performance", "Show migration distribution by territory"),
+    ("🤝 Partner Analysis", "List all partner-attached migrations and their performance"),
+    ("⚠️ High-Risk Migrations", "List high-risk migrations"),
+    ("📈 Pipeline Opportunities", "Show current pipeline opportunities and their status"),
+    ("🎯 Migration Completion Rates", "Show migration completion rates")
+)
+
+def queue_user_message(query):
+    """Button callback: add a query to the chat as if the user had typed it"""
+    st.session_state.messages.append({"role": "user", "content": query})
+
+# Query routing logic
+# Q Business keywords (structured data analysis)
+QBUSINESS_KEYWORDS = [
+    'territory', 'sfdc customer', 'revenue realization', 'partner performance',
+    'migration status', 'detailed report', 'ytd revenue', 'spend variance',
+    'customer territory code', 'engagement id', 'migration delivered by'
+]
+
+# Bedrock KB keywords (semantic search)
+BEDROCK_KEYWORDS = [
+    'explain', 'how to', 'what is', 'describe', 'summary', 'overview',
+    'best practices', 'recommendations', 'challenges', 'insights'
+]
+
+def compile_keywords(keywords):
+    """Compile keywords into one case-insensitive alternation, grouped by first character (longest first)"""
+    ordered = sorted(keywords, key=lambda keyword: (keyword[0], -len(keyword)))
+    # Zero-width lookahead so overlapping keywords ('ytd revenue', 'revenue realization') all match.
+    # Only one keyword is captured per start position, so no keyword may be a prefix of another
+    return re.compile("(?=(" + "|".join(re.escape(keyword) for keyword in ordered) + "))", re.IGNORECASE)
+
+QBUSINESS_RE = compile_keywords(QBUSINESS_KEYWORDS)
+BEDROCK_RE = compile_keywords(BEDROCK_KEYWORDS)
+
+# Cached here rather than in the page script: Streamlit re-executes the script
+# (redefining its functions) on every rerun, but imported modules persist
+@lru_cache(maxsize=512)
+def route_query(query):
+    """Route queries to appropriate system based on content"""
+    # Score = number of distinct keywords present, however often each one appears
+    qbusiness_score = len({match.lower() for match in QBUSINESS_RE.findall(query)})
+    bedrock_score = len({match.lower() for match in BEDROCK_RE.findall(query)})
+    
+    if qbusiness_score > bedrock_score:
+        return 'qbusiness'
+    elif bedrock_score > qbusiness_score:
+        return 'bedrock'
+    else:
+        return 'both'  # Use both for comprehensive analysis
+
+# Queries that ask for a listing or comparison get their answer rendered as a table
+# Whole words and their inflections only (showing, listed, comparison), not showroom/listen/compartment
+_TABULAR_RE = re.compile(r'\b(?:show(?:s|n|ed|ing)?|list(?:s|ed|ing)?|compar(?:e|es|ed|ing|ison|isons))\b', re.IGNORECASE)
+
+def is_tabular_query(query):
+    """Check whether the query asks for data that should be shown as a table"""
+    return _TABULAR_RE.search(query) is not None
+
+# Markdown table header row followed by its |---|:---:| separator row; outer pipes are optional
+TABLE_HEAD_RE = re.compile(
+    r'^([^\n]*\|[^\n]*)\n([ \t]*\|?[ \t]*:?-+:?[ \t]*(?:\|[ \t]*:?-+:?[ \t]*)*\|?[ \t]*\r?)$', re.M)
+# Optional leading/trailing pipe on a row, so GFM rows with and without outer pipes parse alike
+_EDGE_PIPES_RE = re.compile(r'^[ \t]*\|?|\|?[ \t]*$')
+
+def _table_row(line):
+    """Strip the line ending and the optional outer pipes from a markdown table row"""
+    return _EDGE_PIPES_RE.sub('', line.rstrip('\r'))
+
+def format_tabular_response(text):
+    """Convert text with tabular data to DataFrame if possible"""
+    # Most answers have no table at all; skip the regex scan for them
+    if '|' not in text:
+        return None, text
+    
+    # A table starts at a header row with a matching separator row below it
+    for head in TABLE_HEAD_RE.finditer(text):
+        header = _table_row(head.group(1))
+        pipes = header.count('|')
+        if _table_row(head.group(2)).count('|') != pipes:
+            continue
+        
+        # Take the rows below with the header's cell count and outer-pipe style; the first other line ends the table
+        outer = head.group(1).lstrip().startswith('|')
+        rows = [header]
+        end = head.end()
+        for line in text[end + 1:].split('\n'):
+            row = _table_row(line)
+            if '|' not in line or row.count('|') != pipes or line.lstrip().startswith('|') != outer:
+                break
+            rows.append(row)
+            end += 1 + len(line)
+        if len(rows) > 1:  # Header + at least one data row
+            break
+    else:
+        return None, text
+    
+    # No quoting, so every pipe is a separator and pandas' C parser splits the cells as counted above
+    try:
+        import pandas as pd
+        df = pd.read_csv(io.StringIO('\n'.join(rows)), sep='|', engine='c', skipinitialspace=True,
+                         quoting=csv.QUOTE_NONE, index_col=False, dtype=str)
+    except ValueError:
+        return None, text
+    
+    df.columns = df.columns.str.strip()
+    df = df.apply(lambda column: column.str.rstrip())
+    return df, text[:head.start()] + text[end:]
+
+# Number of most recent chat messages rendered on each rerun
+HISTORY_WINDOW = 20
+
+# Shared page sections for the knowledge-base assistant pages
+def render_quick_actions():
+    """Render the Quick Action buttons"""
+    st.markdown("### Quick Actions")
+    cols = st.columns(3)
+    
+    # on_click runs before the rerun, so the query is already in the history when it renders
+    for i, (label, query) in enumerate(QUICK_ACTIONS):
+        cols[i // 2].button(label, on_click=queue_user_message, args=(query,))
+
+def visible_messages(messages, show_earlier=False):
+    """Return the chat messages to render: the last HISTORY_WINDOW, or all of them when show_earlier is set"""
+    return messages if show_earlier else messages[-HISTORY_WINDOW:]
+
+def render_chat_history():
+    """Render the conversation so far"""
+    messages = st.session_state.messages
+    # A toggle rather than a collapsed expander, which would still send every earlier turn to the browser
+    show_earlier = len(messages) > HISTORY_WINDOW and st.toggle("Show earlier messages", key="show_earlier_messages")
+    for message in visible_messages(messages, show_earlier):
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+def render_streamed_answer(stream, user_query):
+    """Stream an assistant answer into the chat, with a table above it for list-style queries"""
+    with st.chat_message("assistant"):
+        # Reserve space above the streamed text for a table parsed from the finished answer
+        table_slot = st.empty()
+        with st.spinner("Analyzing migration data..."):
+            response = st.write_stream(stream)
+        
+        # Check if response should be tabular
+        if is_tabular_query(user_query):
+            df, _ = format_tabular_response(response)
+            if df is not None:
+                with table_slot.container():
+                    st.dataframe(df, use_container_width=True)
+                    st.markdown("---")
+                    st.markdown("**Detailed Analysis:**")
+    return response
+
+def render_sidebar():
+    """Render the sidebar with sample queries"""
+    with st.sidebar:
+        st.markdown("### Sample Queries")
+        
+        for heading, queries in SAMPLE_QUERY_GROUPS:
+            st.markdown(f"**{heading}:**")
+            for query in queries:
+                st.code(query)
@@ -0,0 +1,105 @@
+import os
+import sys
+import types
+
+# Only the pure helpers are tested here, so Streamlit itself is not needed
+sys.modules.setdefault("streamlit", types.ModuleType("streamlit"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migration_core import format_tabular_response, is_tabular_query, route_query, validate_input
+
+
+def _table(text):
+    df, remaining = format_tabular_response(text)
+    assert df is not None
+    return list(df.columns), df.values.tolist(), remaining
+
+
+# Tables
+def test_table_with_outer_pipes():
+    columns, rows, remaining = _table("Intro\n\n| Name | Status |\n|---|:---:|\n| A | B |\n| C | D |\n\nAfter")
+    assert columns == ["Name", "Status"]
+    assert rows == [["A", "B"], ["C", "D"]]
+    assert "Intro" in remaining and "After" in remaining and "|" not in remaining
+
+
+def test_table_without_outer_pipes():
+    columns, rows, _ = _table("Name | Status\n---|---\nA | B")
+    assert columns == ["Name", "Status"]
+    assert rows == [["A", "B"]]
+
+
+def test_table_with_crlf_line_endings():
+    columns, rows, remaining = _table("x\r\n| Name | Status |\r\n|---|---|\r\n| A | B |\r\nend")
+    assert columns == ["Name", "Status"]
+    assert rows == [["A", "B"]]
+    assert remaining.startswith("x") and remaining.endswith("end")
+
+
+def test_prose_line_above_table_is_not_the_header():
+    columns, rows, remaining = _table("Options: a | b\n| A | B |\n|---|---|\n| 1 | 2 |")
+    assert columns == ["A", "B"]
+    assert rows == [["1", "2"]]
+    assert remaining.startswith("Options: a | b")
+
+
+def test_prose_line_below_table_ends_it():
+    for text in ("| A | B |\n|---|---|\n| 1 | 2 |\nNote: values in USD | EUR",
+                 "| A | B | C |\n|---|---|---|\n| 1 | 2 | 3 |\nNote: values in USD | EUR"):
+        _, rows, remaining = _table(text)
+        assert len(rows) == 1
+        assert "Note: values in USD | EUR" in remaining
+
+
+def test_ragged_row_ends_the_table():
+    _, rows, remaining = _table("| a | b |\n|---|---|\n| 0 | 1 |\n| 1 | 2 | 3 |")
+    assert rows == [["0", "1"]]
+    assert "| 1 | 2 | 3 |" in remaining
+
+
+def test_no_table_without_separator_row():
+    for text in ("no pipes at all", "just a | pipe here", "| a | b |\n| 1 | 2 |", "| a | b |\n|---|---|"):
+        assert format_tabular_response(text) == (None, text)
+
+
+def test_tabular_query_words():
+    assert is_tabular_query("Show me all customers")
+    assert is_tabular_query("listing of partners")
+    assert is_tabular_query("comparison of territories")
+    assert not is_tabular_query("what compartment is this in")
+    assert not is_tabular_query("listen to the showroom")
+
+
+# Routing
+def test_overlapping_keywords_all_count():
+    # 'ytd revenue' and 'revenue realization' share 'revenue'
+    assert route_query("What is the current YTD revenue realization vs target?") == "qbusiness"
+
+
+def test_repeated_keyword_counts_once():
+    assert route_query("territory territory explain") == "both"
+    assert route_query("Explain the customer territory code and summary") == "both"
+
+
+def test_route_is_case_insensitive():
+    assert route_query("EXPLAIN the BEST PRACTICES") == "bedrock"
+    assert route_query("Migration Status by Territory") == "qbusiness"
+
+
+# Input validation
+def test_byte_limit_for_ascii():
+    assert validate_input("a" * 2000) == (True, "")
+    assert validate_input("a" * 2001) == (False, "Query too long (max 2000 bytes)")
+
+
+def test_byte_limit_for_multibyte_text():
+    # 3 bytes per CJK character, 4 per emoji
+    assert validate_input("中" * 666)[0]
+    assert not validate_input("中" * 667)[0]
+    assert validate_input("😀" * 500)[0]
+    assert not validate_input("😀" * 501)[0]
+
+
+def test_blocked_patterns():
+    assert validate_input("<SCRIPT>alert(1)</script>") == (False, "Invalid input detected")
+    assert validate_input("call eval(x)") == (False, "Invalid input detected")